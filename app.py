@@ -1,21 +1,162 @@
 import streamlit as st
 import sqlite3
 from datetime import datetime
-import re
-import pandas as pd
+import time
 from PIL import Image
 import io
+import csv
+import os
+import hashlib
+import tempfile
+import queue
+import atexit
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
 
 # Configuração inicial do Streamlit
 st.set_page_config(page_title="Controle de Acesso Carbon", layout="wide", page_icon="🚗")
 
+DB_PATH = 'carbon_access.db'
+READ_POOL_SIZE = 4
+# Entradas do cache de dados de veículo por placa
+VEHICLE_META_CACHE_SIZE = 512
+# Comandos preparados mantidos por conexão (sqlite3_prepare só na primeira execução)
+STATEMENT_CACHE_SIZE = 256
+# Registros de acesso são gravados em lote: a cada intervalo ou ao atingir o tamanho do lote
+ACCESS_FLUSH_INTERVAL = 0.25
+ACCESS_BATCH_SIZE = 32
+# Tempo máximo que flush_accesses espera a thread de escrita gravar a fila
+ACCESS_FLUSH_TIMEOUT = 5.0
+# Linhas por página do relatório de acessos
+REPORT_PAGE_SIZE = 10000
+
+# Tabela de histórico de acessos; data_hora em segundos Unix.
+# Parametrizada pelo nome para ser reaproveitada na migração de bancos antigos
+ACCESS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        veiculo_id INTEGER,
+        data_hora INTEGER NOT NULL,
+        acesso_permitido BOOLEAN,
+        observacoes TEXT,
+        FOREIGN KEY (veiculo_id) REFERENCES veiculos(id)
+    )
+'''
+
+# Tabela de classe de caractere indexada pelo byte: letra -> 'A', número -> '0', resto -> '?'
+_CHAR_CLASS = bytes(
+    ord('A') if ord('A') <= b <= ord('Z') else ord('0') if ord('0') <= b <= ord('9') else ord('?')
+    for b in range(256)
+)
+# Padrão Mercosul: AAA0A00 (3 letras, 1 número, 1 letra ou número, 2 números)
+# Padrão antigo: AAA0000 (3 letras, 4 números)
+_PLATE_LAYOUTS = frozenset({b'AAA0A00', b'AAA0000'})
+
+# Fotos são armazenadas reduzidas: a interface as exibe com no máximo 150 px
+PHOTO_SIZE = (300, 300)
+PHOTO_QUALITY = 85
+# Maior tamanho em que a interface exibe a foto; a decodificação JPEG já reduz até ele
+PHOTO_DISPLAY_SIZE = (150, 150)
+# Fotos ficam fora do banco, em PHOTO_DIR/<sha256>.jpg; o banco guarda só o hash
+PHOTO_DIR = 'photos'
+
+def make_thumbnail(photo):
+    img = Image.open(io.BytesIO(photo))
+    img.thumbnail(PHOTO_SIZE)
+    buffer = io.BytesIO()
+    img.convert("RGB").save(buffer, format="JPEG", quality=PHOTO_QUALITY)
+    return buffer.getvalue()
+
+def photo_path(photo_hash):
+    return os.path.join(PHOTO_DIR, f"{photo_hash}.jpg")
+
+def hash_photo(photo):
+    return hashlib.sha256(photo).hexdigest()
+
+def store_photo(photo):
+    # Endereçada pelo conteúdo: fotos iguais são gravadas uma única vez
+    photo_hash = hash_photo(photo)
+    path = photo_path(photo_hash)
+    if not os.path.exists(path):
+        # Grava num temporário exclusivo e renomeia: nunca fica um arquivo pela metade,
+        # mesmo com duas sessões enviando a mesma foto ao mesmo tempo
+        fd, tmp_path = tempfile.mkstemp(dir=PHOTO_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(photo)
+            os.replace(tmp_path, path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+    return photo_hash
+
 class VehicleAccessSystem:
     def __init__(self):
-        self.conn = sqlite3.connect('carbon_access.db')
+        # A instância é compartilhada entre as sessões (st.cache_resource),
+        # que rodam em threads diferentes do servidor Streamlit
+        # isolation_level=None: sem transações implícitas; operações com vários
+        # comandos abrem BEGIN explicitamente
+        self.conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None,
+                                    cached_statements=STATEMENT_CACHE_SIZE)
+        # WAL: leituras não bloqueiam escritas e vice-versa. Fica gravado no
+        # arquivo do banco, então basta defini-lo nesta conexão
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._tune_connection(self.conn)
+        os.makedirs(PHOTO_DIR, exist_ok=True)
         self.create_database()
 
+        # Conexões somente leitura para as consultas mais frequentes
+        self.read_pool = queue.Queue()
+        for _ in range(READ_POOL_SIZE):
+            conn = sqlite3.connect(f'file:{DB_PATH}?mode=ro', uri=True, check_same_thread=False,
+                                   cached_statements=STATEMENT_CACHE_SIZE)
+            self._tune_connection(conn)
+            self.read_pool.put(conn)
+
+        # Dados do veículo por placa: tupla pequena e imutável, um LRU em memória basta
+        # (st.cache_data serializaria o resultado a cada acesso). Fica na instância, que
+        # sobrevive aos reruns; uma função de módulo seria recriada a cada execução do script
+        self.cached_vehicle_meta = lru_cache(maxsize=VEHICLE_META_CACHE_SIZE)(self.get_vehicle_meta)
+        # Cache placa -> id do veículo, só de placas cadastradas: placas digitadas
+        # que não existem não ficam acumuladas em memória
+        self.vehicle_ids = {}
+        # Fila de acessos pendentes, gravada pela thread de escrita
+        self.pending_accesses = deque()
+        self.pending_lock = threading.Lock()
+        self.flush_event = threading.Event()
+        # Contadores de acessos enfileirados e já gravados: flush_accesses espera
+        # o segundo alcançar o primeiro. Só a thread de escrita abre transações
+        self.queued_count = 0
+        self.written_count = 0
+        self.written_cond = threading.Condition(self.pending_lock)
+        self.stopping = False
+        self.writer = threading.Thread(target=self._access_writer, daemon=True)
+        self.writer.start()
+        # A thread de escrita é daemon: ao encerrar, ela mesma grava o que restar na fila
+        atexit.register(self.close)
+
+    @staticmethod
+    def _tune_connection(conn):
+        # PRAGMAs valem por conexão: aplicados à principal, às de leitura e à de escrita
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-20000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+
+    @contextmanager
+    def read_connection(self):
+        conn = self.read_pool.get()
+        try:
+            yield conn
+        finally:
+            self.read_pool.put(conn)
+
     def create_database(self):
         cursor = self.conn.cursor()
+        cursor.execute("BEGIN")
         
         # Tabela de colaboradores
         cursor.execute('''
@@ -24,7 +165,7 @@ class VehicleAccessSystem:
                 nome TEXT NOT NULL,
                 cargo TEXT NOT NULL,
                 tag_id TEXT UNIQUE,
-                foto BLOB,
+                foto_hash TEXT,
                 ativo BOOLEAN DEFAULT 1
             )
         ''')
@@ -43,94 +184,229 @@ class VehicleAccessSystem:
             )
         ''')
         
-        # Tabela de histórico de acessos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS acessos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                veiculo_id INTEGER,
-                data_hora TEXT NOT NULL,
-                acesso_permitido BOOLEAN,
-                observacoes TEXT,
-                FOREIGN KEY (veiculo_id) REFERENCES veiculos(id)
-            )
-        ''')
+        # Tabela de histórico de acessos (data_hora em segundos Unix)
+        cursor.execute(ACCESS_TABLE_SQL.format(table="acessos"))
+        self.migrate_access_timestamps(cursor)
+        self.migrate_photos(cursor)
+        
+        # Índices das colunas usadas em filtros, junções e ordenação
+        # (veiculo_id, data_hora) atende também buscas só por veiculo_id
+        cursor.execute("DROP INDEX IF EXISTS idx_acessos_veiculo")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_acessos_vid_data ON acessos(veiculo_id, data_hora)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_acessos_data ON acessos(data_hora DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_veiculos_colab ON veiculos(colaborador_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_colaboradores_ativo_nome ON colaboradores(ativo, nome)")
         
         self.conn.commit()
 
+    def migrate_access_timestamps(self, cursor):
+        # Bancos antigos guardam data_hora como TEXT "YYYY-MM-DD HH:MM:SS" em hora local
+        columns = {row[1]: row[2] for row in cursor.execute("PRAGMA table_info(acessos)")}
+        if columns["data_hora"] != "TEXT":
+            return
+        cursor.execute(ACCESS_TABLE_SQL.format(table="acessos_novo"))
+        cursor.execute('''
+            INSERT INTO acessos_novo (id, veiculo_id, data_hora, acesso_permitido, observacoes)
+            SELECT id, veiculo_id, CAST(strftime('%s', data_hora, 'utc') AS INTEGER),
+                   acesso_permitido, observacoes
+            FROM acessos
+        ''')
+        cursor.execute("DROP TABLE acessos")
+        cursor.execute("ALTER TABLE acessos_novo RENAME TO acessos")
+
+    def migrate_photos(self, cursor):
+        # Bancos antigos guardam a foto como BLOB em colaboradores.foto
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(colaboradores)")}
+        if "foto" not in columns:
+            return
+        cursor.execute("ALTER TABLE colaboradores ADD COLUMN foto_hash TEXT")
+        rows = cursor.execute("SELECT id, foto FROM colaboradores WHERE foto IS NOT NULL").fetchall()
+        for employee_id, photo in rows:
+            # Uploads antigos podiam ser PNG: regrava como miniatura JPEG, como nos cadastros novos
+            try:
+                photo_hash = store_photo(make_thumbnail(photo))
+            except OSError:
+                # BLOB que não é uma imagem legível: não havia foto a exibir
+                continue
+            cursor.execute("UPDATE colaboradores SET foto_hash = ? WHERE id = ?", (photo_hash, employee_id))
+        cursor.execute("ALTER TABLE colaboradores DROP COLUMN foto")
+
     def validate_plate(self, plate):
         # Remove espaços e hífens, converte para maiúsculas
         plate = plate.replace(" ", "").replace("-", "").upper()
-        # Padrão Mercosul: AAA0A00 (3 letras, 1 número, 1 letra ou número, 2 números)
-        # Padrão antigo: AAA0000 (3 letras, 4 números)
-        mercosul_pattern = r'^[A-Z]{3}[0-9][A-Z0-9][0-9]{2}$'
-        old_pattern = r'^[A-Z]{3}[0-9]{4}$'
-        return bool(re.match(mercosul_pattern, plate) or re.match(old_pattern, plate))
+        # Uma única passada em C (translate) e uma busca no conjunto de layouts
+        return plate.encode().translate(_CHAR_CLASS) in _PLATE_LAYOUTS
 
-    def get_vehicle_info(self, plate):
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT v.placa, v.modelo, v.marca, v.cor, v.tipo_veiculo,
-                   c.nome, c.cargo, c.tag_id, c.foto
-            FROM veiculos v
-            JOIN colaboradores c ON v.colaborador_id = c.id
-            WHERE v.placa = ?
-        ''', (plate,))
-        return cursor.fetchone()
+    def get_vehicle_meta(self, plate):
+        # Só colunas de texto; a foto é buscada à parte, em get_employee_photo
+        with self.read_connection() as conn:
+            return conn.execute('''
+                SELECT v.placa, v.modelo, v.marca, v.cor, v.tipo_veiculo,
+                       c.nome, c.cargo, c.tag_id, c.id
+                FROM veiculos v
+                JOIN colaboradores c ON v.colaborador_id = c.id
+                WHERE v.placa = ?
+            ''', (plate,)).fetchone()
+
+    def get_employee_photo(self, employee_id):
+        with self.read_connection() as conn:
+            row = conn.execute("SELECT foto_hash FROM colaboradores WHERE id = ?", (employee_id,)).fetchone()
+        if not row or not row[0]:
+            # Colaborador sem foto ou inexistente
+            return None
+        # Decodifica o JPEG em escala reduzida (draft usa o DCT do libjpeg)
+        try:
+            with Image.open(photo_path(row[0])) as img:
+                img.draft("RGB", PHOTO_DISPLAY_SIZE)
+                img.load()
+        except OSError:
+            # Arquivo ausente ou ilegível (ex.: pasta photos/ não copiada junto com o banco)
+            return None
+        return img
 
     def get_employees_by_name(self, name):
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT id, nome, cargo, tag_id, foto
+        return self.conn.execute('''
+            SELECT id, nome, cargo, tag_id
             FROM colaboradores
             WHERE nome LIKE ? AND ativo = 1
-        ''', (f'%{name}%',))
-        return cursor.fetchall()
+        ''', (f'%{name}%',)).fetchall()
 
     def get_vehicles_by_employee(self, employee_id):
-        cursor = self.conn.cursor()
-        cursor.execute('''
+        return self.conn.execute('''
             SELECT placa, modelo, marca, cor, tipo_veiculo
             FROM veiculos
             WHERE colaborador_id = ?
-        ''', (employee_id,))
-        return cursor.fetchall()
+        ''', (employee_id,)).fetchall()
+
+    def get_access_stats(self, start=None, end=None):
+        # Totais do período calculados no SQLite, sem trazer as linhas para o Python
+        where, params = ("WHERE data_hora BETWEEN ? AND ?", (start, end)) if start is not None else ("", ())
+        with self.read_connection() as conn:
+            return conn.execute(f'''
+                SELECT COUNT(*), COALESCE(SUM(CASE WHEN acesso_permitido THEN 1 ELSE 0 END), 0)
+                FROM acessos
+                {where}
+            ''', params).fetchone()
+
+    def get_vehicle_id(self, plate):
+        vehicle_id = self.vehicle_ids.get(plate)
+        if vehicle_id is None:
+            with self.read_connection() as conn:
+                row = conn.execute("SELECT id FROM veiculos WHERE placa = ?", (plate,)).fetchone()
+            if row is None:
+                return None
+            vehicle_id = self.vehicle_ids[plate] = row[0]
+        return vehicle_id
 
     def register_access(self, plate, allowed, notes=""):
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT id FROM veiculos WHERE placa = ?", (plate,))
-        vehicle_id = cursor.fetchone()
+        vehicle_id = self.get_vehicle_id(plate)
         
         if vehicle_id:
-            cursor.execute('''
-                INSERT INTO acessos (veiculo_id, data_hora, acesso_permitido, observacoes)
-                VALUES (?, ?, ?, ?)
-            ''', (vehicle_id[0], datetime.now().strftime("%Y-%m-%d %H:%M:%S"), allowed, notes))
-            self.conn.commit()
+            with self.pending_lock:
+                self.pending_accesses.append(
+                    (vehicle_id, int(time.time()), allowed, notes)
+                )
+                self.queued_count += 1
+                if len(self.pending_accesses) >= ACCESS_BATCH_SIZE:
+                    self.flush_event.set()
             return True
         return False
 
+    def _write_pending_accesses(self, conn):
+        # Chamado só pela thread de escrita. O lote continua na fila até o commit:
+        # se a gravação falhar, nada se perde e ele é regravado na próxima vez
+        with self.pending_lock:
+            batch = list(self.pending_accesses)
+        if not batch:
+            return
+        try:
+            # IMMEDIATE: reserva a escrita já no início, evitando SQLITE_BUSY no meio do lote
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany('''
+                INSERT INTO acessos (veiculo_id, data_hora, acesso_permitido, observacoes)
+                VALUES (?, ?, ?, ?)
+            ''', batch)
+            conn.commit()
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        with self.pending_lock:
+            # Novos acessos só entram pela direita: os primeiros len(batch) são o lote gravado
+            for _ in batch:
+                self.pending_accesses.popleft()
+            self.written_count += len(batch)
+            self.written_cond.notify_all()
+
+    def _access_writer(self):
+        # Conexão própria da thread: um único commit (fsync) por lote
+        conn = sqlite3.connect(DB_PATH, isolation_level=None, cached_statements=STATEMENT_CACHE_SIZE)
+        self._tune_connection(conn)
+        while True:
+            self.flush_event.wait(ACCESS_FLUSH_INTERVAL)
+            self.flush_event.clear()
+            try:
+                self._write_pending_accesses(conn)
+            except sqlite3.Error:
+                # A thread continua viva; o lote ficou na fila e é regravado na próxima volta
+                logging.exception("Falha ao gravar acessos pendentes")
+                continue
+            if self.stopping and not self.pending_accesses:
+                break
+        conn.close()
+
+    def flush_accesses(self):
+        # Pede à thread de escrita que grave já e espera até que todo acesso
+        # enfileirado antes desta chamada esteja no banco (antes de consultar o histórico)
+        with self.written_cond:
+            target = self.queued_count
+            self.flush_event.set()
+            self.written_cond.wait_for(lambda: self.written_count >= target, timeout=ACCESS_FLUSH_TIMEOUT)
+
+    def close(self):
+        # Encerra a thread de escrita depois de ela gravar a fila em sua própria conexão
+        self.stopping = True
+        self.flush_event.set()
+        self.writer.join(ACCESS_FLUSH_TIMEOUT)
+
     def add_employee(self, name, position, tag_id, photo):
+        try:
+            thumbnail = make_thumbnail(photo) if photo else None
+        except OSError:
+            # Arquivo com extensão de imagem que o PIL não consegue decodificar
+            st.error("Foto inválida")
+            return None
         try:
             cursor = self.conn.cursor()
             cursor.execute('''
-                INSERT INTO colaboradores (nome, cargo, tag_id, foto)
+                INSERT INTO colaboradores (nome, cargo, tag_id, foto_hash)
                 VALUES (?, ?, ?, ?)
-            ''', (name, position, tag_id, photo))
+            ''', (name, position, tag_id, hash_photo(thumbnail) if thumbnail else None))
             self.conn.commit()
+            # Arquivo gravado só depois do INSERT: Tag ID duplicada não deixa foto órfã
+            if thumbnail:
+                store_photo(thumbnail)
+            _load_employees.clear()
             return cursor.lastrowid
         except sqlite3.IntegrityError:
             st.error("Tag ID já cadastrada")
             return None
 
     def update_employee_photo(self, employee_id, photo):
+        try:
+            photo_hash = store_photo(make_thumbnail(photo)) if photo else None
+        except OSError:
+            st.error("Foto inválida")
+            return False
         try:
             cursor = self.conn.cursor()
             cursor.execute('''
                 UPDATE colaboradores
-                SET foto = ?
+                SET foto_hash = ?
                 WHERE id = ?
-            ''', (photo, employee_id))
+            ''', (photo_hash, employee_id))
             self.conn.commit()
+            _get_employee_photo_cached.clear()
             return cursor.rowcount > 0
         except sqlite3.Error as e:
             st.error(f"Erro ao atualizar foto: {str(e)}")
@@ -147,15 +423,79 @@ class VehicleAccessSystem:
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (plate.upper(), model, brand, color, employee_id, vehicle_type))
             self.conn.commit()
+            self.vehicle_ids.pop(plate.upper(), None)
+            self.cached_vehicle_meta.cache_clear()
             return True, "Veículo cadastrado com sucesso"
         except sqlite3.IntegrityError:
             return False, "Placa já cadastrada"
 
+@st.cache_resource
+def get_system():
+    # Criado uma única vez por processo, e não a cada rerun do script
+    return VehicleAccessSystem()
+
+@st.cache_data(max_entries=256, ttl=300)
+def _get_employee_photo_cached(employee_id):
+    # Foto buscada só na hora de exibir; limpo em update_employee_photo.
+    # O ttl faz expirar também o None de um arquivo ausente, caso photos/ seja restaurada
+    return get_system().get_employee_photo(employee_id)
+
+@st.cache_data(ttl=30)
+def _load_employees():
+    # Opções do seletor de proprietário; limpo em add_employee
+    with get_system().read_connection() as conn:
+        employees = conn.execute("SELECT id, nome FROM colaboradores WHERE ativo = 1 ORDER BY nome").fetchall()
+    return {f"{e[1]} (ID:{e[0]})": e[0] for e in employees}
+
 # Interface Streamlit
-system = VehicleAccessSystem()
+system = get_system()
 
 st.title("🚗 Sistema de Controle de Acesso - Carbon")
 
+@st.fragment
+def employee_search():
+    # Fragmento: interações da busca por nome reexecutam só este bloco
+    name_input = st.text_input("Digite o nome do colaborador (ex.: Marcelo):")
+    notes_name = st.text_area("Observações (opcional):", key="notes_name")
+    
+    if st.button("Buscar Colaborador"):
+        if name_input:
+            employees = system.get_employees_by_name(name_input)
+            if employees:
+                st.subheader("Colaboradores Encontrados")
+                for emp in employees:
+                    emp_id, emp_name, emp_position, emp_tag = emp
+                    st.write("---")
+                    col1, col2 = st.columns([3, 1])
+                    
+                    with col1:
+                        st.write(f"**Nome:** {emp_name}")
+                        st.write(f"**Cargo:** {emp_position}")
+                        st.write(f"**Tag ID:** {emp_tag}")
+                    
+                    with col2:
+                        emp_photo = _get_employee_photo_cached(emp_id)
+                        if emp_photo:
+                            st.image(emp_photo, caption="Foto do Colaborador", width=100)
+                    
+                    vehicles = system.get_vehicles_by_employee(emp_id)
+                    if vehicles:
+                        st.write("**Veículos Associados:**")
+                        selected_vehicle = st.selectbox(
+                            "Selecione um veículo para registrar acesso",
+                            options=[v[0] for v in vehicles],
+                            key=f"vehicle_select_{emp_id}"
+                        )
+                        if st.button("Registrar Acesso", key=f"register_access_{emp_id}"):
+                            system.register_access(selected_vehicle, True, notes_name)
+                            st.success(f"Acesso LIBERADO para veículo {selected_vehicle}")
+                    else:
+                        st.info("Nenhum veículo associado a este colaborador.")
+            else:
+                st.warning("Nenhum colaborador encontrado com este nome.")
+        else:
+            st.warning("Digite um nome para buscar.")
+
 # Menu lateral
 menu_option = st.sidebar.selectbox("Menu", ["Controle de Acesso", "Cadastros", "Relatórios"])
 
@@ -165,14 +505,17 @@ if menu_option == "Controle de Acesso":
     tab1, tab2 = st.tabs(["Busca por Placa", "Busca por Nome"])
     
     with tab1:
-        plate_input = st.text_input("Digite a placa do veículo (ex.: ABC1D23 ou ABC1234):").upper()
-        notes_plate = st.text_area("Observações (opcional):", key="notes_plate")
+        # Formulário: digitar placa e observações não dispara rerun, só o envio
+        with st.form("consult"):
+            plate_input = st.text_input("Digite a placa do veículo (ex.: ABC1D23 ou ABC1234):").upper()
+            notes_plate = st.text_area("Observações (opcional):", key="notes_plate")
+            consult = st.form_submit_button("Consultar Placa")
         
-        if st.button("Consultar Placa"):
+        if consult:
             if plate_input and system.validate_plate(plate_input):
-                vehicle_info = system.get_vehicle_info(plate_input)
+                vehicle_info = system.cached_vehicle_meta(plate_input)
                 if vehicle_info:
-                    plate, model, brand, color, v_type, name, position, tag_id, photo = vehicle_info
+                    plate, model, brand, color, v_type, name, position, tag_id, employee_id = vehicle_info
                     
                     st.success("🚘 Veículo encontrado - Acesso LIBERADO")
                     
@@ -191,15 +534,18 @@ if menu_option == "Controle de Acesso":
                         st.write(f"**Cargo:** {position}")
                         st.write(f"**Tag ID:** {tag_id}")
                         
+                        photo = _get_employee_photo_cached(employee_id)
                         if photo:
-                            st.image(Image.open(io.BytesIO(photo)), caption="Foto do Colaborador", width=150)
+                            st.image(photo, caption="Foto do Colaborador", width=150)
                     
                     system.register_access(plate, True, notes_plate)
                     
                     # Exibir últimos acessos
+                    system.flush_accesses()
                     cursor = system.conn.cursor()
                     cursor.execute('''
-                        SELECT data_hora, acesso_permitido, observacoes
+                        SELECT datetime(data_hora, 'unixepoch', 'localtime'),
+                               CASE WHEN acesso_permitido THEN 'LIBERADO' ELSE 'NEGADO' END, observacoes
                         FROM acessos a
                         JOIN veiculos v ON a.veiculo_id = v.id
                         WHERE v.placa = ?
@@ -208,13 +554,11 @@ if menu_option == "Controle de Acesso":
                     accesses = cursor.fetchall()
                     if accesses:
                         st.subheader("Últimos Acessos")
-                        df = pd.DataFrame(
-                            accesses,
-                            columns=["Data/Hora", "Status", "Observações"],
-                            index=range(1, len(accesses) + 1)
+                        # Poucas linhas: a lista vai direto para o Streamlit, sem DataFrame
+                        st.dataframe(
+                            [{"Data/Hora": when, "Status": status, "Observações": notes} for when, status, notes in accesses],
+                            hide_index=True
                         )
-                        df["Status"] = df["Status"].apply(lambda x: "LIBERADO" if x else "NEGADO")
-                        st.dataframe(df)
                 else:
                     st.error("⚠️ Veículo não cadastrado - Acesso NEGADO")
                     system.register_access(plate_input, False, notes_plate)
@@ -222,50 +566,7 @@ if menu_option == "Controle de Acesso":
                 st.warning("Formato de placa inválido. Use o padrão Mercosul (ex.: ABC1D23) ou antigo (ex.: ABC1234)")
     
     with tab2:
-        name_input = st.text_input("Digite o nome do colaborador (ex.: Marcelo):")
-        notes_name = st.text_area("Observações (opcional):", key="notes_name")
-        
-        if st.button("Buscar Colaborador"):
-            if name_input:
-                employees = system.get_employees_by_name(name_input)
-                if employees:
-                    st.subheader("Colaboradores Encontrados")
-                    for emp in employees:
-                        emp_id, emp_name, emp_position, emp_tag, emp_photo = emp
-                        st.write("---")
-                        col1, col2 = st.columns([3, 1])
-                        
-                        with col1:
-                            st.write(f"**Nome:** {emp_name}")
-                            st.write(f"**Cargo:** {emp_position}")
-                            st.write(f"**Tag ID:** {emp_tag}")
-                        
-                        with col2:
-                            if emp_photo:
-                                st.image(Image.open(io.BytesIO(emp_photo)), caption="Foto do Colaborador", width=100)
-                        
-                        vehicles = system.get_vehicles_by_employee(emp_id)
-                        if vehicles:
-                            st.write("**Veículos Associados:**")
-                            df_vehicles = pd.DataFrame(
-                                vehicles,
-                                columns=["Placa", "Modelo", "Marca", "Cor", "Tipo"],
-                                index=range(1, len(vehicles) + 1)
-                            )
-                            selected_vehicle = st.selectbox(
-                                "Selecione um veículo para registrar acesso",
-                                options=df_vehicles["Placa"],
-                                key=f"vehicle_select_{emp_id}"
-                            )
-                            if st.button("Registrar Acesso", key=f"register_access_{emp_id}"):
-                                system.register_access(selected_vehicle, True, notes_name)
-                                st.success(f"Acesso LIBERADO para veículo {selected_vehicle}")
-                        else:
-                            st.info("Nenhum veículo associado a este colaborador.")
-                else:
-                    st.warning("Nenhum colaborador encontrado com este nome.")
-            else:
-                st.warning("Digite um nome para buscar.")
+        employee_search()
 
 elif menu_option == "Cadastros":
     st.header("Cadastros")
@@ -294,10 +595,7 @@ elif menu_option == "Cadastros":
                     st.error("Preencha todos os campos obrigatórios")
     
     with tab2:
-        cursor = system.conn.cursor()
-        cursor.execute("SELECT id, nome FROM colaboradores")
-        employees = cursor.fetchall()
-        employee_options = {f"{e[1]} (ID:{e[0]})": e[0] for e in employees}
+        employee_options = _load_employees()
         
         with st.form("vehicle_form"):
             st.subheader("Novo Veículo")
@@ -338,11 +636,9 @@ elif menu_option == "Cadastros":
                     
                     # Exibir foto atual
                     selected_emp_id = employee_options[selected_employee]
-                    cursor = system.conn.cursor()
-                    cursor.execute("SELECT foto FROM colaboradores WHERE id = ?", (selected_emp_id,))
-                    current_photo = cursor.fetchone()[0]
+                    current_photo = _get_employee_photo_cached(selected_emp_id)
                     if current_photo:
-                        st.image(Image.open(io.BytesIO(current_photo)), caption="Foto Atual", width=150)
+                        st.image(current_photo, caption="Foto Atual", width=150)
                     
                     if st.button("Atualizar Foto"):
                         if selected_photo:
@@ -362,28 +658,55 @@ elif menu_option == "Relatórios":
     st.header("Relatórios de Acesso")
     
     date_range = st.date_input("Selecione o período", [])
+    page = st.number_input("Página", min_value=1, value=1, step=1)
     
     if st.button("Gerar Relatório"):
-        cursor = system.conn.cursor()
-        query = '''
-            SELECT a.data_hora, v.placa, v.modelo, v.marca, c.nome, c.cargo, 
-                   CASE WHEN a.acesso_permitido THEN 'LIBERADO' ELSE 'NEGADO' END as status
+        where = ""
+        params = ()
+        start = end = None
+        if date_range:
+            # Filtro por intervalo no próprio SQL, aproveitando idx_acessos_data.
+            # Com uma única data selecionada, o relatório cobre só aquele dia
+            where = "WHERE a.data_hora BETWEEN ? AND ?"
+            start = int(datetime.combine(date_range[0], datetime.min.time()).timestamp())
+            end = int(datetime.combine(date_range[-1], datetime.max.time()).timestamp())
+            params = (start, end)
+        query = f'''
+            SELECT datetime(a.data_hora, 'unixepoch', 'localtime') AS "Data/Hora", v.placa AS "Placa", v.modelo AS "Modelo",
+                   v.marca AS "Marca", c.nome AS "Proprietário", c.cargo AS "Cargo",
+                   CASE WHEN a.acesso_permitido THEN 'LIBERADO' ELSE 'NEGADO' END AS "Status"
             FROM acessos a
             JOIN veiculos v ON a.veiculo_id = v.id
             LEFT JOIN colaboradores c ON v.colaborador_id = c.id
+            {where}
             ORDER BY a.data_hora DESC
+            LIMIT ? OFFSET ?
         '''
-        cursor.execute(query)
-        data = cursor.fetchall()
+        params += (REPORT_PAGE_SIZE, (page - 1) * REPORT_PAGE_SIZE)
+        system.flush_accesses()
+        total, allowed = system.get_access_stats(start, end)
         
-        if data:
-            df = pd.DataFrame(data, columns=["Data/Hora", "Placa", "Modelo", "Marca", "Proprietário", "Cargo", "Status"])
-            st.dataframe(df)
+        if total:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Total de Acessos", total)
+            col2.metric("Liberados", allowed)
+            col3.metric("Negados", total - allowed)
+            
+            # Linhas detalhadas só quando o período tem acessos
+            with system.read_connection() as conn:
+                cursor = conn.execute(query, params)
+                columns = [col[0] for col in cursor.description]
+                rows = cursor.fetchall()
+            st.dataframe([dict(zip(columns, row)) for row in rows], hide_index=True)
             
-            csv = df.to_csv(index=False).encode('utf-8')
+            # CSV escrito direto das linhas, sem passar pelo DataFrame
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            writer.writerows(rows)
             st.download_button(
                 "Baixar como CSV",
-                data=csv,
+                data=buffer.getvalue().encode('utf-8'),
                 file_name="relatorio_acessos.csv",
                 mime="text/csv"
             )
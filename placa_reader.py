@@ -1,16 +1,118 @@
 import cv2
+import os
+import heapq
+import string
 import sqlite3
-from datetime import datetime
-import re
-import easyocr
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
+# O OpenMP do Tesseract só atrapalha num recorte pequeno; o paralelismo fica
+# por conta de vários processos (ler_placas_lote). Precisa ser definido antes
+# de a libtesseract ser carregada
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+from tesserocr import OEM, PSM, PyTessBaseAPI
 import pandas as pd
 
+# Caracteres possíveis em uma placa (Mercosul ou antiga)
+CARACTERES_PLACA = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+# Remove do texto lido tudo que não pode fazer parte de uma placa (laço em C do str.translate)
+TABELA_LIMPEZA = {c: None for c in range(256) if chr(c) not in CARACTERES_PLACA}
+# Classe de cada byte: letra -> 'A', número -> '0', resto -> '?'
+CLASSE_CARACTERE = bytes(
+    ord('A') if chr(b) in string.ascii_uppercase else ord('0') if chr(b) in string.digits else ord('?')
+    for b in range(256)
+)
+# Formato Mercosul: AAA0A00
+LAYOUT_MERCOSUL = b'AAA0A00'
+# Maior lado da imagem processada; fotos de celular são reduzidas antes do OCR
+LADO_MAXIMO = 1024
+# T-API: com OpenCL disponível, redimensionamento e limiar rodam na GPU/iGPU.
+# Sem OpenCL o UMat só acrescenta cópias, então é usado apenas quando há dispositivo
+USAR_OPENCL = cv2.ocl.haveOpenCL()
+
+class PlacaOCR:
+    # Placa Mercosul mede 400 x 130 mm; o recorte é normalizado para 1 px/mm
+    TAMANHO_RECORTE = (400, 130)
+    # Filtros de candidato, para imagens com no máximo LADO_MAXIMO px
+    PROPORCAO_MIN, PROPORCAO_MAX = 2.5, 5.0
+    AREA_MIN, AREA_MAX = 1000, 50000
+    # Quantos candidatos, do maior para o menor, passam pelo Tesseract
+    MAX_CANDIDATOS = 5
+
+    def __init__(self):
+        # API do Tesseract em processo: o modelo é carregado uma vez e reaproveitado,
+        # sem abrir um subprocesso por imagem.
+        # SINGLE_WORD (--psm 8): o recorte contém uma única "palavra", a própria placa
+        self.api = PyTessBaseAPI(lang='por', psm=PSM.SINGLE_WORD, oem=OEM.DEFAULT)
+        self.api.SetVariable('tessedit_char_whitelist', CARACTERES_PLACA)
+
+    def localizar_placas(self, thresh):
+        # Maiores retângulos com proporção e área de placa, do maior para o menor
+        contornos, _ = cv2.findContours(thresh, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        candidatos = []
+        for contorno in contornos:
+            x, y, w, h = cv2.boundingRect(contorno)
+            if (self.PROPORCAO_MIN <= w / h <= self.PROPORCAO_MAX
+                    and self.AREA_MIN <= w * h <= self.AREA_MAX):
+                candidatos.append((x, y, w, h))
+        return heapq.nlargest(self.MAX_CANDIDATOS, candidatos, key=lambda r: r[2] * r[3])
+
+    def ler(self, thresh, retangulo):
+        x, y, w, h = retangulo
+        recorte = cv2.resize(thresh[y:y + h, x:x + w], self.TAMANHO_RECORTE, interpolation=cv2.INTER_AREA)
+        # Margem branca: o Tesseract erra caracteres encostados na borda
+        recorte = cv2.copyMakeBorder(recorte, 10, 10, 10, 10, cv2.BORDER_CONSTANT, value=255)
+        # Buffer em tons de cinza entregue direto ao Tesseract (1 byte por pixel),
+        # sem montar uma imagem PIL intermediária
+        altura, largura = recorte.shape
+        self.api.SetImageBytes(recorte.tobytes(), largura, altura, 1, largura)
+        return self.api.GetUTF8Text()
+
+def placa_valida(placa):
+    # Sem regex: um bytes.translate para as classes e uma comparação
+    return placa.encode().translate(CLASSE_CARACTERE) == LAYOUT_MERCOSUL
+
+@lru_cache(maxsize=None)
+def get_ocr():
+    # Uma instância por processo
+    return PlacaOCR()
+
+def ler_placa_arquivo(imagem_path):
+    # Função de módulo, e não método, para poder ser enviada a outros processos
+    # Decodifica direto em tons de cinza: o OCR não usa cor
+    gray = cv2.imread(imagem_path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return None
+    return ler_placa_cinza(gray)
+
+def ler_placa_cinza(gray):
+    # Pipeline a partir de uma imagem já em tons de cinza (arquivo ou frame da câmera)
+    escala = LADO_MAXIMO / max(gray.shape[:2])
+    if USAR_OPENCL:
+        gray = cv2.UMat(gray)
+    if escala < 1:
+        gray = cv2.resize(gray, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+    # Limiar adaptativo: suavização gaussiana e limiarização numa única passada.
+    # Texto escuro sobre fundo claro, como o Tesseract espera
+    thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+    if USAR_OPENCL:
+        thresh = thresh.get()
+
+    # Reconhecimento com Tesseract só sobre recortes com formato de placa;
+    # sem nenhum candidato o OCR nem é executado
+    ocr = get_ocr()
+    for retangulo in ocr.localizar_placas(thresh):
+        placa = ocr.ler(thresh, retangulo).upper().translate(TABELA_LIMPEZA)
+        if placa_valida(placa):
+            return placa
+    return None
+
 class PlacaReaderApp:
     def __init__(self):
         # Configurações iniciais
-        self.conn = sqlite3.connect('placas_liberadas.db')
+        # O processamento da câmera roda numa thread de trabalho
+        self.conn = sqlite3.connect('placas_liberadas.db', check_same_thread=False)
         self.criar_banco_dados()
-        self.reader = easyocr.Reader(['en'], gpu=False)  # Inicializa EasyOCR
 
     def criar_banco_dados(self):
         # Criando tabela de placas liberadas
@@ -37,26 +139,15 @@ class PlacaReaderApp:
         self.conn.commit()
 
     def validar_placa(self, placa):
-        # Valida formato Mercosul: AAA0A00
-        padrao_mercosul = r'^[A-Z]{3}[0-9][A-Z][0-9]{2}$'
-        return bool(re.match(padrao_mercosul, placa))
+        return placa_valida(placa)
 
     def ler_placa(self, imagem_path):
-        # Pré-processamento da imagem
-        img = cv2.imread(imagem_path)
-        if img is None:
-            return None
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        blur = cv2.GaussianBlur(gray, (3, 3), 0)
-        thresh = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
-
-        # Reconhecimento com EasyOCR
-        resultados = self.reader.readtext(thresh)
-        for (bbox, texto, prob) in resultados:
-            placa = ''.join(e for e in texto if e.isalnum()).upper()
-            if self.validar_placa(placa):
-                return placa
-        return None
+        return ler_placa_arquivo(imagem_path)
+
+    def ler_placas_lote(self, imagens_paths):
+        # Um Tesseract de thread única por núcleo, cada um em seu processo
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            return list(executor.map(ler_placa_arquivo, imagens_paths))
 
     def verificar_placa(self, placa):
         cursor = self.conn.cursor()
@@ -68,22 +159,27 @@ class PlacaReaderApp:
             return False, "Placa fora do padrão Mercosul"
         try:
             cursor = self.conn.cursor()
-            cursor.execute("INSERT INTO placas_liberadas (placa, proprietario, data_cadastro, observacoes) VALUES (?, ?, ?, ?)",
-                          (placa, proprietario, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), observacoes))
+            cursor.execute("INSERT INTO placas_liberadas (placa, proprietario, data_cadastro, observacoes) VALUES (?, ?, datetime('now', 'localtime'), ?)",
+                          (placa, proprietario, observacoes))
             self.conn.commit()
             return True, "Placa cadastrada com sucesso"
         except sqlite3.IntegrityError:
             return False, "Placa já cadastrada"
 
     def registrar_acesso(self, resultado):
+        # Data/hora gerada pelo próprio SQLite, no mesmo formato "YYYY-MM-DD HH:MM:SS"
         cursor = self.conn.cursor()
-        cursor.execute("INSERT INTO historico_acessos (placa, data_hora, liberado, mensagem) VALUES (?, ?, ?, ?)",
-                      (resultado.get('placa', ''), datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                       resultado.get('liberado', False), resultado.get('mensagem', '')))
+        cursor.execute("INSERT INTO historico_acessos (placa, data_hora, liberado, mensagem) VALUES (?, datetime('now', 'localtime'), ?, ?)",
+                      (resultado.get('placa', ''), resultado.get('liberado', False), resultado.get('mensagem', '')))
         self.conn.commit()
 
     def processar_entrada_veiculo(self, imagem_path):
-        placa = self.ler_placa(imagem_path)
+        return self.processar_placa(self.ler_placa(imagem_path))
+
+    def processar_frame(self, cinza):
+        return self.processar_placa(ler_placa_cinza(cinza))
+
+    def processar_placa(self, placa):
         if placa:
             liberado = self.verificar_placa(placa)
             resultado = {
@@ -101,14 +197,22 @@ class PlacaReaderApp:
         if not cap.isOpened():
             return {'erro': 'Não foi possível acessar a câmera'}
 
+        # OCR em segundo plano: captura e exibição não esperam o Tesseract
+        executor = ThreadPoolExecutor(max_workers=1)
+        futuro = None
+        resultado = {}
         while True:
             ret, frame = cap.read()
             if not ret:
                 break
 
-            # Salva frame temporário para processamento
-            cv2.imwrite('temp_frame.jpg', frame)
-            resultado = self.processar_entrada_veiculo('temp_frame.jpg')
+            if futuro is None or futuro.done():
+                if futuro is not None:
+                    resultado = futuro.result()
+                # O frame já vem decodificado: converte para cinza em memória, sem
+                # regravar e decodificar um JPEG temporário a cada leitura
+                cinza = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                futuro = executor.submit(self.processar_frame, cinza)
 
             # Exibe o resultado no frame
             texto = resultado.get('mensagem', resultado.get('erro', ''))
@@ -120,6 +224,7 @@ class PlacaReaderApp:
             if cv2.waitKey(1) & 0xFF == ord('q'):
                 break
 
+        executor.shutdown()
         cap.release()
         cv2.destroyAllWindows()
         return resultado